@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from dundie.models.user import UserResponse
 from dundie.db import ActiveSession
 from sqlmodel import Session, select
@@ -11,7 +12,8 @@ from dundie.routes import main_router
 app = FastAPI(
     title="dundie",
     version="0.1.0",
-    description="dundie is a rewards API"
+    description="dundie is a rewards API",
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(main_router)
@@ -129,6 +129,7 @@ def get_current_user(
 
 
 # FastAPI dependencies
+# the ones doing database lookups are sync so FastAPI runs them in the threadpool
 
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
@@ -153,12 +154,12 @@ SuperUser = Depends(get_current_super_user)
 
 
 
-async def validate_token(token: str = Depends(oauth2_scheme)) -> User:
+def validate_token(token: str = Depends(oauth2_scheme)) -> User:
     """Validates user token"""
     user = get_current_user(token=token)
     return user
 
-async def get_user_if_change_password_is_allowed(
+def get_user_if_change_password_is_allowed(
         *,
         request: Request,
         pwd_reset_token: Optional[str] = None,
@@ -199,7 +200,7 @@ async def get_user_if_change_password_is_allowed(
 
 CanChangeUserPassword = Depends(get_user_if_change_password_is_allowed)
 
-async def show_balance_field(
+def show_balance_field(
         *,
         request: Request,
         show_balance: Optional[bool] = False
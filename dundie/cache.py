@@ -0,0 +1,50 @@
+"""Redis cache
+
+The cache is optional: when redis fails the helpers log it and
+callers fall back to the database.
+"""
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from dundie.config import settings
+
+logger = logging.getLogger(__name__)
+
+cache = Redis(
+    host=settings.redis.host,
+    port=settings.redis.port,
+    socket_timeout=settings.redis.cache_timeout,
+    socket_connect_timeout=settings.redis.cache_timeout,
+)
+
+
+def user_cache_key(username: str) -> str:
+    """Key where the public profile of `username` is cached"""
+    return f"user:{username}"
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """Returns the cached value or None on miss or redis failure"""
+    try:
+        return await cache.get(key)
+    except RedisError:
+        logger.warning("Could not read %s from cache", key, exc_info=True)
+        return None
+
+
+async def cache_set(key: str, value: bytes, ttl: int):
+    """Caches value for ttl seconds, redis failures are ignored"""
+    try:
+        await cache.set(key, value, ex=ttl)
+    except RedisError:
+        logger.warning("Could not write %s to cache", key, exc_info=True)
+
+
+async def cache_delete(key: str):
+    """Invalidates key, redis failures are ignored (entry expires by ttl)"""
+    try:
+        await cache.delete(key)
+    except RedisError:
+        logger.warning("Could not delete %s from cache", key, exc_info=True)
@@ -1,17 +1,80 @@
 """Database connection"""
+import logging
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
 from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
 from fastapi import Depends
 
 
+def get_pool_options(uri: str, pool_size: int, max_overflow: int) -> dict:
+    """Connection pool options for the given database uri"""
+    options = {
+        "pool_pre_ping": settings.db.pool_pre_ping,
+        "pool_recycle": settings.db.pool_recycle,
+    }
+    # sqlite uses a pool without a fixed size
+    if make_url(uri).get_backend_name() != "sqlite":
+        options["pool_size"] = pool_size
+        options["max_overflow"] = max_overflow
+    return options
+
+
+def get_async_uri(uri: str) -> URL:
+    """Database uri using an asyncio driver, `db.async_uri` takes precedence"""
+    url = make_url(settings.db.get("async_uri") or uri)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.drivername in ("sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+# statements are never logged in production, regardless of `db.echo`
+if settings.current_env.lower() == "production":
+    ECHO = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+else:
+    ECHO = settings.db.echo
+
+# sync engine, used by the CLI, migrations and task workers
 engine = create_engine(
     settings.db.uri, 
-    echo=settings.db.echo,
-    connect_args=settings.db.connect_args
+    echo=ECHO,
+    echo_pool=False,
+    connect_args=settings.db.connect_args,
+    **get_pool_options(
+        settings.db.uri,
+        settings.db.sync_pool_size,
+        settings.db.sync_max_overflow,
+    ),
+)
+
+# async engine, used by the API routes
+async_engine = create_async_engine(
+    get_async_uri(settings.db.uri),
+    echo=ECHO,
+    echo_pool=False,
+    connect_args=settings.db.connect_args,
+    **get_pool_options(
+        settings.db.uri,
+        settings.db.pool_size,
+        settings.db.max_overflow,
+    ),
+)
+
+async_session = sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
 )
 
-def get_session():
-    with Session(engine) as session:
+async def get_session():
+    async with async_session() as session:
         yield session
 
-ActiveSession = Depends(get_session)
\ No newline at end of file
+ActiveSession = Depends(get_session)
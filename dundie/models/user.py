@@ -1,9 +1,10 @@
 """User related data models."""
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index
 from fastapi import HTTPException, status
 from sqlmodel import Field, SQLModel, Relationship
 from dundie.security import HashedPassword, get_password_hash
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, PrivateAttr, root_validator
 
 if TYPE_CHECKING: # Evita o erro de import circular
     from dundie.models.transaction import Transaction, Balance
@@ -12,8 +13,13 @@ if TYPE_CHECKING: # Evita o erro de import circular
 class User(SQLModel, table=True):
     """Represents the User in the system."""
 
+    __table_args__ = (
+        # covering index, id -> username lookups are index-only scans
+        Index("ix_user_id_username", "id", postgresql_include=["username"]),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    email: str = Field(unique=True, nullable=False)
+    email: str = Field(unique=True, nullable=False, index=True)
     username: str = Field(unique=True, nullable=False)
     avatar: Optional[str] = None
     bio: Optional[str] = None
@@ -23,24 +29,33 @@ class User(SQLModel, table=True):
     currency: str = Field(nullable=False)
 
     # Populates a `.user` on `Transaction`
+    # lazy loading raises, use `selectinload(User.incomes)` to load it
     incomes: Optional[list["Transaction"]] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"primaryjoin": 'User.id == Transaction.user_id'},
+        sa_relationship_kwargs={
+            "primaryjoin": 'User.id == Transaction.user_id',
+            "lazy": "raise",
+        },
     )
     # Populates a `.from_user` on `Transaction`
+    # lazy loading raises, use `selectinload(User.expenses)` to load it
     expenses: Optional[list["Transaction"]] = Relationship(
         back_populates="from_user",
-        sa_relationship_kwargs={"primaryjoin": 'User.id == Transaction.from_id'},
+        sa_relationship_kwargs={
+            "primaryjoin": 'User.id == Transaction.from_id',
+            "lazy": "raise",
+        },
     )
     # Populates a `.user` on `Balance`
+    # use `selectinload(User._balance)` when listing many users
     _balance: Optional["Balance"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"lazy": "dynamic"}
+        sa_relationship_kwargs={"uselist": False}
     )
     @property
     def balance(self) -> int:
         """Returns the current balance of the user"""
-        if (user_balance := self._balance.first()) is not None:  # pyright: ignore
+        if (user_balance := self._balance) is not None:
             return user_balance.value
         return 0
 
@@ -49,9 +64,11 @@ class User(SQLModel, table=True):
         """Users belonging to management dept are admins."""
         return self.dept == "management"
     
+_SLUG_TABLE = str.maketrans({" ": "-", "_": "-"})
+
 def generate_username(name: str) -> str:
     """Generate a slug from user.name"""
-    return name.lower().replace(" ", "-").replace("_", "-")
+    return name.lower().translate(_SLUG_TABLE)
 
 class UserResponse(BaseModel):
     """Serializer for when we send a response to the client."""
@@ -66,12 +83,6 @@ class UserResponse(BaseModel):
 class UserResponseWithBalance(UserResponse):
     balance: Optional[int] = None
 
-    @root_validator(pre=True)
-    def set_balance(cls, values):
-        instance = values['_sa_instance_state'].object
-        values['balance'] = instance.balance
-        return values
-
 
 class UserRequest(BaseModel):
     """Serializer for User request payload"""
@@ -102,6 +113,7 @@ class UserProfilePatchReuest(BaseModel):
 class UserPasswordPatchRequest(BaseModel):
     password: str
     password_confirm: str
+    _hashed_password: Optional[str] = PrivateAttr(default=None)
 
     @root_validator()
     def check_password_match(cls, values):
@@ -115,5 +127,7 @@ class UserPasswordPatchRequest(BaseModel):
     
     @property
     def hashed_password(self) -> str:
-        """Returns hashed password"""
-        return get_password_hash(self.password)
\ No newline at end of file
+        """Returns hashed password, computed only once as hashing is slow"""
+        if self._hashed_password is None:
+            self._hashed_password = get_password_hash(self.password)
+        return self._hashed_password
\ No newline at end of file
@@ -22,7 +22,7 @@ router = APIRouter()
 
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     user = authenticate_user(get_user, form_data.username, form_data.password)
@@ -52,8 +52,8 @@ async def login_for_access_token(
 
 
 @router.post("/refresh_token", response_model=Token)
-async def refresh_token(form_data: RefreshToken):
-    user = await validate_token(token=form_data.refresh_token)
+def refresh_token(form_data: RefreshToken):
+    user = validate_token(token=form_data.refresh_token)
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)  # pyright: ignore
     access_token = create_access_token(
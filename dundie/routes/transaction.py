@@ -1,5 +1,5 @@
 import re
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from fastapi import APIRouter, Body, HTTPException, Depends
 from pytest import param
 from dundie.auth import AuthenticatedUser
@@ -8,9 +8,10 @@ from dundie.models.serializers import TransactionResponse
 from dundie.models import User
 from dundie.models.transaction import Transaction
 from dundie.tasks.transaction import add_transaction, TransactionError
-from sqlmodel import select, Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi_pagination import Page, Params
-from fastapi_pagination.ext.sqlmodel import paginate
+from fastapi_pagination.ext.async_sqlmodel import paginate
 from sqlalchemy.orm import aliased
 from sqlmodel import text
 
@@ -18,21 +19,46 @@ from sqlmodel import text
 router = APIRouter()
 
 
+async def serialize_transactions(
+    session: AsyncSession, transactions: Sequence[Transaction]
+) -> List[TransactionResponse]:
+    """Serializes transactions resolving all usernames in a single query."""
+    ids = {t.user_id for t in transactions} | {t.from_id for t in transactions}
+    id2name = dict(
+        (await session.exec(select(User.id, User.username).where(User.id.in_(ids)))).all()
+    ) if ids else {}
+    return [
+        TransactionResponse(
+            id=t.id,
+            value=t.value,
+            date=t.date,
+            user=id2name.get(t.user_id),
+            from_user=id2name.get(t.from_id),
+        )
+        for t in transactions
+    ]
+
+
 @router.post('/{username}/', status_code=201)
 async def create_transaction(
     *,
     username: str,
     value: int = Body(embed=True),
     current_user: User = AuthenticatedUser,
-    session: Session = ActiveSession
+    session: AsyncSession = ActiveSession
 ):
     """Adds a new transaction to the specified user."""
-    user = session.exec(select(User).where(User.username == username)).first()
+    user = (await session.exec(select(User).where(User.username == username))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     try:
-        add_transaction(user=user, from_user=current_user, value=value, session=session)
+        # add_transaction is sync, run_sync gives it the underlying sync session
+        await session.run_sync(
+            lambda sync_session: add_transaction(
+                user=user, from_user=current_user, value=value, session=sync_session
+            )
+        )
     except TransactionError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -43,7 +69,7 @@ async def create_transaction(
 async def list_transaction(
     *,
     current_user: User = AuthenticatedUser,
-    session: Session = ActiveSession,
+    session: AsyncSession = ActiveSession,
     params: Params = Depends(),
     from_user: Optional[str] = None,
     user: Optional[str] = None,
@@ -77,4 +103,6 @@ async def list_transaction(
         )
         query = query.order_by(order_text)
 
-    return paginate(query=query, session=session, params=params)
\ No newline at end of file
+    page = await paginate(query=query, session=session, params=params)
+    page.items = await serialize_transactions(session, page.items)
+    return page
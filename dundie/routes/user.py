@@ -1,6 +1,8 @@
-from sqlmodel import Session, select
-from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import APIRouter, HTTPException, Body, Response
 from dundie.db import ActiveSession
+from dundie.models.transaction import Balance
 from dundie.models.user import (
     User, 
     UserResponse, 
@@ -9,119 +11,190 @@ from dundie.models.user import (
     UserPasswordPatchRequest,
     UserResponseWithBalance,
 )
-from typing import List
+import re
+from typing import List, Optional
 from dundie.auth import AuthenticatedUser, SuperUser, CanChangeUserPassword
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
-from dundie.tasks.user import try_to_send_pwd_reset_email
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
-from pydantic import parse_obj_as
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+from dundie.tasks.user import enqueue_pwd_reset_email
+from fastapi.responses import ORJSONResponse
 from dundie.auth import ShowBalanceField
-from dundie.queue import queue
+from dundie.cache import cache_delete, cache_get, cache_set, user_cache_key
+from dundie.config import settings
+import orjson
 
 router = APIRouter()
 
-@router.get("/",
-            response_model_exclude_unset=True # Omite os campos virtuais
-            )
+# columns read to build a UserResponse, straight from its fields
+USER_RESPONSE_COLUMNS = [User.__table__.c[field] for field in UserResponse.__fields__]
+
+
+def select_user_response(show_balance: bool = False):
+    """Selects the UserResponse columns, plus balance if requested.
+
+    rows come from the database so they are already valid,
+    build responses with `Model.construct(**row._asdict())`.
+    """
+    if show_balance:
+        # balance comes in the same query, users without balance have 0
+        return select(
+            *USER_RESPONSE_COLUMNS, func.coalesce(Balance.value, 0).label("balance")
+        ).join(Balance, isouter=True)
+    return select(*USER_RESPONSE_COLUMNS)
+
+
+PG_UNIQUE_CONSTRAINT = re.compile(r'unique constraint "([^"]+)"')
+SQLITE_UNIQUE_COLUMN = re.compile(r"UNIQUE constraint failed: \w+\.(\w+)")
+
+
+def unique_violation_field(error: IntegrityError) -> Optional[str]:
+    """Returns the user field a UNIQUE violation happened on, None otherwise.
+
+    Only constraint and column names are looked at, the rest of the error
+    text holds the offending value.
+    """
+    orig = error.orig
+    if getattr(orig, "pgcode", None) == UNIQUE_VIOLATION:
+        # asyncpg keeps the violated constraint on the original error
+        constraint = getattr(orig.__cause__, "constraint_name", None)
+        if constraint is None and (match := PG_UNIQUE_CONSTRAINT.search(str(orig))):
+            constraint = match.group(1)
+        # constraints are named after their column, e.g. user_username_key
+        for field in ("email", "username"):
+            if field in (constraint or ""):
+                return field
+        return None
+    if match := SQLITE_UNIQUE_COLUMN.match(str(orig)):
+        return match.group(1)
+    return None
+
+
+# Responses are built and encoded by the views, `response_model=None`
+# avoids FastAPI validating them again, `responses` keeps the docs.
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": List[UserResponseWithBalance]}},
+)
 async def list_users(
     *,
-    session: Session = ActiveSession,
+    session: AsyncSession = ActiveSession,
     show_balance_field: bool = ShowBalanceField
     
-    ) -> List[UserResponse] | List[UserResponseWithBalance]:
+    ) -> Response:
     """List all users from database."""
-    users = session.exec(select(User)).all()
-    if show_balance_field:
-        users_with_balance = parse_obj_as(List[UserResponseWithBalance], users)
-        return JSONResponse(jsonable_encoder(users_with_balance))
-    return users
+    model = UserResponseWithBalance if show_balance_field else UserResponse
+    rows = (await session.exec(select_user_response(show_balance_field))).all()
+    return ORJSONResponse([model.construct(**row._asdict()).dict() for row in rows])
 
-@router.get("/{username}/",
-            response_model_exclude_unset=True
-            )
+@router.get(
+    "/{username}/",
+    response_model=None,
+    responses={200: {"model": UserResponseWithBalance}},
+)
 async def get_user_by_username(
     *, 
     username: str, 
-    session: Session = ActiveSession,
+    session: AsyncSession = ActiveSession,
     show_balance_field: bool = ShowBalanceField
-) -> UserResponse | UserResponseWithBalance:
+) -> Response:
     """Get a user by username."""
-    user = session.exec(select(User).where(User.username == username)).first()
+    # Only the public profile is cached, balance is never shared across users
+    if not show_balance_field:
+        if (cached := await cache_get(user_cache_key(username))) is not None:
+            return Response(content=cached, media_type="application/json")
+
+    query = select_user_response(show_balance_field).where(User.username == username)
+    row = (await session.exec(query)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
     if show_balance_field:
-            user_with_balance = parse_obj_as(UserResponseWithBalance, user)
-            return JSONResponse(jsonable_encoder(user_with_balance))
-    return user
+        return ORJSONResponse(UserResponseWithBalance.construct(**row._asdict()).dict())
+
+    content = orjson.dumps(UserResponse.construct(**row._asdict()).dict())
+    await cache_set(user_cache_key(username), content, settings.redis.user_cache_ttl)
+    return Response(content=content, media_type="application/json")
 
 
 @router.post(
     "/", response_model=UserResponse, status_code=201, dependencies=[SuperUser]
 )
-async def create_user(*, session: Session = ActiveSession, user: UserRequest):
+async def create_user(*, session: AsyncSession = ActiveSession, user: UserRequest):
     """Creates new user"""
-    # LBYL
-    if session.exec(select(User).where(User.username == user.username)).first():
-        raise HTTPException(status_code=409, detail="Username already taken")
-
     db_user = User.from_orm(user)  # transform UserRequest in User
     session.add(db_user)
-    # EAFP
+    # EAFP: the UNIQUE constraint on username is the source of truth
     try:
-        session.commit()
-    except IntegrityError:
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        field = unique_violation_field(e)
+        if field == "email":
+            raise HTTPException(status_code=409, detail="Email already taken")
+        if field == "username":
+            raise HTTPException(status_code=409, detail="Username already taken")
         raise HTTPException(status_code=500, detail="Database IntegrityError")
 
-    session.refresh(db_user)
+    await session.refresh(db_user)
     return db_user
 
 @router.patch("/{username}/")
 async def update_user(
     *,
-    session: Session = ActiveSession,
+    session: AsyncSession = ActiveSession,
     patch_data: UserProfilePatchReuest,
     current_user: User = AuthenticatedUser,
     username: str) -> UserResponse:
 
-    user = session.exec(select(User).where(User.username == username)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if user.id != current_user.id and not current_user.superuser:
+    # permission is checked against the authenticated user, no query needed
+    if username != current_user.username and not current_user.superuser:
         raise HTTPException(
             status_code=403, 
             detail="You can only update your own profiel"
             )
-    
-    # Update
-    user.avatar = patch_data.avatar if patch_data.avatar is not None else user.avatar
-    user.bio = patch_data.bio if patch_data.bio is not None else user.bio
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
+
+    # Update, fields set to None are kept unchanged
+    table = User.__table__
+    where = table.c.username == username
+    values = patch_data.dict(exclude_none=True)
+    if values and session.bind.dialect.implicit_returning:
+        # a single UPDATE ... RETURNING gives back the updated row
+        query = update(table).where(where).values(**values).returning(*USER_RESPONSE_COLUMNS)
+    else:
+        if values:
+            # no RETURNING on this backend (sqlite), read the row back after
+            await session.execute(update(table).where(where).values(**values))
+        query = select_user_response().where(where)
+    row = (await session.execute(query)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    await session.commit()
+    await cache_delete(user_cache_key(username))
+    return UserResponse.construct(**row._asdict())
 
 @router.post("/{username}/password/", response_model=UserResponse)
 async def change_password(
     *,
-    session: Session = ActiveSession,
+    session: AsyncSession = ActiveSession,
     patch_data: UserPasswordPatchRequest,
     user: User = CanChangeUserPassword
 ):
     user.password = patch_data.hashed_password  # pyright: ignore
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
+    await cache_delete(user_cache_key(user.username))
     return user
 
 @router.post("/pwd_reset_token/")
-async def send_password_reset_token(
+def send_password_reset_token(
         *, 
         email: str = Body(embed=True),
-        # background_tasks: BackgroundTasks
-    
     ):
     """Sends an email with the token to reset password."""
-    # background_tasks.add_task(try_to_send_pwd_reset_email, email=email)
-    queue.enqueue(try_to_send_pwd_reset_email, email=email)
+    # sync view: the redis client used by the queue is blocking
+    enqueue_pwd_reset_email(email)
     return {
         "message": "If we found a user with that email, we sent a password reset token to it."
     }
\ No newline at end of file
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlmodel import Session
+from sqlmodel import Session, func, select
 from dundie.db import engine
 from dundie.models import Transaction, Balance
 from dundie.models.user import User
@@ -22,10 +22,15 @@ def add_transaction(
         from_user: The user where amount is coming from or superuser
         value: The value being added
     """
-    if not from_user.superuser and from_user.balance < value:
-        raise TransactionError("Insufficient balance")
-    
     session = session or Session(engine)
+
+    # `from_user` may be detached (e.g: the authenticated user)
+    # so its balance is read through the current session.
+    from_balance = session.get(Balance, from_user.id)
+    available = from_balance.value if from_balance else 0
+    if not from_user.superuser and available < value:
+        raise TransactionError("Insufficient balance")
+
     transaction = Transaction(user=user, from_user=from_user, value=value)
     session.add(transaction)
     session.commit()    
@@ -33,8 +38,14 @@ def add_transaction(
     session.refresh(from_user)
 
     for holder in (user, from_user):
-        total_income = sum([t.value for t in holder.incomes])
-        total_expense = sum([t.value for t in holder.expenses])
+        total_income = session.exec(
+            select(func.coalesce(func.sum(Transaction.value), 0))
+            .where(Transaction.user_id == holder.id)
+        ).one()
+        total_expense = session.exec(
+            select(func.coalesce(func.sum(Transaction.value), 0))
+            .where(Transaction.from_id == holder.id)
+        ).one()
         balance = session.get(
             Balance,
             holder.id,
@@ -1,37 +1,89 @@
 import smtplib
 from datetime import timedelta
-from time import sleep
+from typing import Iterable, List, Tuple
 from idna import encode
 from sqlmodel import Session, select
 from dundie.auth import create_access_token
 from dundie.config import settings
 from dundie.models.user import User
 from dundie.db import engine
+from dundie.queue import queue, redis
+from rq import Retry, get_current_job
 
-def send_email(email: str, message:str):
+# Redis list holding emails waiting for a password reset message
+PWD_RESET_QUEUE = "pwd_reset_queue"
+
+
+class EmailError(Exception):
+    """Can't send emails, `unsent` holds the addresses not sent"""
+
+    def __init__(self, unsent: List[str]):
+        super().__init__(f"Could not send {len(unsent)} email(s)")
+        self.unsent = unsent
+
+
+def send_emails(messages: Iterable[Tuple[str, str]]):
+    """Sends many (email, message) reusing a single connection"""
     if settings.email.debug_mode is True:
-        _send_email_debug(email, message)
+        for email, message in messages:
+            _send_email_debug(email, message)
     else:
-        _send_email_smtp(email, message)
+        _send_emails_smtp(messages)
 
 def _send_email_debug(email: str, message: str):
     """Mock email sending by printing to a file"""
     with open("email.log", "a") as f:
-        sleep(3)
         f.write(f"--- START EMAIL {email} ---\n" f"{message}\n" "--- END OF EMAIL ---\n")
 
-def _send_email_smtp(email: str, message: str):
-    """Connect to SMTP server and send email"""
-    with smtplib.SMTP_SSL(
-        settings.email.smtp_server, settings.email.smtp_port
-    ) as server:
-        server.login(settings.email.smtp_user, settings.email.smtp_password)
-        server.sendmail(
-            settings.email.smtp_sender,
-            email,
-            message.encode("utf-8"),
-    )
-        
+def _log_email_errors(emails: Iterable[str]):
+    """Records the emails that could not be sent"""
+    with open("email.log", "a") as f:
+        for email in emails:
+            f.write(f"--- Erro ao tentar enviar email para <{email}> ---\n")
+
+def _is_permanent_failure(error: smtplib.SMTPException) -> bool:
+    """True when the server refused the recipient for good (5xx)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPSenderRefused):
+        # the sender is refused for every recipient, not only this one
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+def _send_emails_smtp(messages: Iterable[Tuple[str, str]]):
+    """Connect to SMTP server once and send all the emails.
+
+    Recipients refused for good are logged and skipped, any other failure
+    raises `EmailError` holding the addresses not sent yet.
+    """
+    remaining = list(messages)
+    refused = []
+    try:
+        with smtplib.SMTP_SSL(
+            settings.email.smtp_server, settings.email.smtp_port
+        ) as server:
+            server.login(settings.email.smtp_user, settings.email.smtp_password)
+            while remaining:
+                email, message = remaining[0]
+                try:
+                    server.sendmail(
+                        settings.email.smtp_sender,
+                        email,
+                        message.encode("utf-8"),
+                    )
+                except smtplib.SMTPException as e:
+                    if not _is_permanent_failure(e):
+                        raise
+                    refused.append(email)
+                remaining.pop(0)
+    except (smtplib.SMTPException, OSError) as e:
+        raise EmailError([email for email, _ in remaining]) from e
+    finally:
+        if refused:
+            _log_email_errors(refused)
+
 MESSAGE = """\
 From: Dundie <{sender}>
 To: {to}
@@ -43,30 +95,63 @@ Please use the following link to reset your password:
 This link will expire in {expire} minutes.
 """
 
-def try_to_send_pwd_reset_email(email):
-    """Given an email address sends email if user is found"""
+def try_to_send_pwd_reset_emails(emails: List[str]):
+    """Given email addresses sends emails to the users found"""
     with Session(engine) as session:
-        user = session.exec(select(User).where(User.email == email)).first()
-        if not user:
-            with open("email.log", "a") as f:
-                f.write(f"--- Erro ao tentar enviar email para <{email}> ---\n")
-            return
-        sender = settings.email.smtp_sender
-        url = settings.security.PWD_RESET_URL
-        expire = settings.security.RESET_TOKEN_EXPIRE_MINUTES
+        users = session.exec(select(User).where(User.email.in_(set(emails)))).all()
+
+    not_found = set(emails) - {user.email for user in users}
+    if not_found:
+        _log_email_errors(not_found)
+
+    sender = settings.email.smtp_sender
+    url = settings.security.PWD_RESET_URL
+    expire = settings.security.RESET_TOKEN_EXPIRE_MINUTES
+    messages = []
+    for user in users:
         pwd_reset_token = create_access_token(
             data={"sub": user.username},
             expires_delta=timedelta(minutes=expire),
             scope="pwd_reset",
         )
-
-        send_email(
-            email=user.email,
-            message=MESSAGE.format(
-                sender=sender,
-                to=user.email,
-                url=url,
-                pwd_reset_token=pwd_reset_token,
-                expire=expire,
-            ),
+        messages.append(
+            (
+                user.email,
+                MESSAGE.format(
+                    sender=sender,
+                    to=user.email,
+                    url=url,
+                    pwd_reset_token=pwd_reset_token,
+                    expire=expire,
+                ),
+            )
         )
+    if messages:
+        send_emails(messages)
+
+def enqueue_pwd_reset_email(email: str):
+    """Adds email to the pending list and schedules a worker to send it"""
+    redis.rpush(PWD_RESET_QUEUE, email)
+    queue.enqueue(send_pending_pwd_reset_emails, retry=Retry(max=3, interval=60))
+
+def send_pending_pwd_reset_emails():
+    """Drains the pending list sending the emails in batches.
+
+    Under bursts the first job sends everything and the following ones
+    find the list empty. On failure the unsent addresses go back to the
+    list and the job fails, so rq retries it; once the retries are over
+    nothing would pick them up again, so they are logged and dropped.
+    """
+    batch_size = settings.email.batch_size
+    while pending := redis.lpop(PWD_RESET_QUEUE, batch_size):
+        emails = [email.decode() for email in pending]
+        try:
+            try_to_send_pwd_reset_emails(emails)
+        except Exception as e:
+            unsent = e.unsent if isinstance(e, EmailError) else emails
+            job = get_current_job()
+            if unsent and job and job.retries_left:
+                redis.lpush(PWD_RESET_QUEUE, *reversed(unsent))
+            elif unsent:
+                _log_email_errors(unsent)
+            raise
@@ -1,6 +1,7 @@
 import os
 
 import pytest
+from anyio.from_thread import start_blocking_portal
 from fastapi.testclient import TestClient
 from sqlalchemy.exc import IntegrityError
 
@@ -10,13 +11,31 @@ from dundie.cli import user_create
 os.environ["DUNDIE_DB__uri"] = "postgresql://postgres:postgres@db:5432/dundie_test"
 
 
+@pytest.fixture(scope="session")
+def portal():
+    """Event loop shared by all test clients.
+
+    TestClient starts a new event loop per request unless it has a portal,
+    and the async database/redis connection pools can't be reused across loops.
+    """
+    with start_blocking_portal() as portal:
+        yield portal
+
+
+def create_api_client(portal):
+    """Creates a new api client running on the shared portal."""
+    client = TestClient(app)
+    client.portal = portal
+    return client
+
+
 @pytest.fixture(scope="function")
-def api_client():
+def api_client(portal):
     """Unauthenticated test client"""
-    return TestClient(app)
+    return create_api_client(portal)
 
 
-def create_api_client_authenticated(username, dept="sales", create=True):
+def create_api_client_authenticated(username, portal, dept="sales", create=True):
     """Creates a new api client authenticated for the specified user."""
     if create:
         try:
@@ -24,7 +43,7 @@ def create_api_client_authenticated(username, dept="sales", create=True):
         except IntegrityError:
             pass
 
-    client = TestClient(app)
+    client = create_api_client(portal)
     token = client.post(
         "/token",
         data={"username": username, "password": username},
@@ -35,20 +54,20 @@ def create_api_client_authenticated(username, dept="sales", create=True):
 
 
 @pytest.fixture(scope="function")
-def api_client_admin():
-    return create_api_client_authenticated("admin", create=False)
+def api_client_admin(portal):
+    return create_api_client_authenticated("admin", portal, create=False)
 
 
 @pytest.fixture(scope="function")
-def api_client_user1():
-    return create_api_client_authenticated("user1", dept="management")
+def api_client_user1(portal):
+    return create_api_client_authenticated("user1", portal, dept="management")
 
 
 @pytest.fixture(scope="function")
-def api_client_user2():
-    return create_api_client_authenticated("user2")
+def api_client_user2(portal):
+    return create_api_client_authenticated("user2", portal)
 
 
 @pytest.fixture(scope="function")
-def api_client_user3():
-    return create_api_client_authenticated("user3")
+def api_client_user3(portal):
+    return create_api_client_authenticated("user3", portal)
@@ -25,6 +25,36 @@ def test_user_list(
         assert set(user.keys()) == USER_RESPONSE_KEYS
 
 
+@pytest.mark.order(2)
+def test_fail_create_duplicated_username(api_client_admin):
+    """Creating a user with an existing username returns 409"""
+    data = {
+        "name": "User 1",
+        "email": "another_user1@dm.com",
+        "dept": "sales",
+        "password": "user1",
+        "username": "user1",
+    }
+    response = api_client_admin.post("/user/", json=data)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Username already taken"
+
+
+@pytest.mark.order(2)
+def test_fail_create_duplicated_email(api_client_admin):
+    """Creating a user with an existing email returns 409"""
+    data = {
+        "name": "User 4",
+        "email": "user1@dm.com",
+        "dept": "sales",
+        "password": "user4",
+        "username": "user4",
+    }
+    response = api_client_admin.post("/user/", json=data)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Email already taken"
+
+
 @pytest.mark.order(2)
 def test_user_detail(api_client):
     """Ensure that the /user/{username} API is working"""
@@ -60,6 +90,22 @@ def test_fail_update_user_profile_by_other_user(api_client_user2):
     assert response.status_code == 403
 
 
+@pytest.mark.order(3)
+def test_update_user_profile_with_empty_patch(api_client_admin):
+    """An empty patch changes nothing and returns the profile"""
+    user = api_client_admin.get("/user/user1/").json()
+    response = api_client_admin.patch("/user/user1/", json={})
+    assert response.status_code == 200
+    assert response.json() == user
+
+
+@pytest.mark.order(3)
+def test_fail_update_user_profile_not_found(api_client_admin):
+    """Admin patching an unknown user gets a 404"""
+    response = api_client_admin.patch("/user/notauser/", json={"bio": "nobody"})
+    assert response.status_code == 404
+
+
 @pytest.mark.order(4)
 def test_add_transaction_for_users_from_admin(api_client_admin):
     """Admin user adds a transaction for all users"""
@@ -0,0 +1,132 @@
+import smtplib
+from types import SimpleNamespace
+
+import pytest
+
+from dundie.tasks import user as user_tasks
+
+
+class FakeRedis:
+    """Just the list commands the pwd reset queue uses"""
+
+    def __init__(self):
+        self.lists = {}
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(v.encode() for v in values)
+
+    def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value.encode())
+
+    def lpop(self, key, count):
+        items = self.lists.get(key, [])
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped or None
+
+
+class FakeSMTP:
+    """Records logins and sent emails, failing for the addresses in `errors`"""
+
+    logins = 0
+    sent = []
+    errors = {}
+
+    def __init__(self, host, port):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def login(self, user, password):
+        FakeSMTP.logins += 1
+
+    def sendmail(self, sender, email, message):
+        if email in self.errors:
+            raise self.errors[email]
+        FakeSMTP.sent.append(email)
+
+
+@pytest.fixture
+def smtp(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # email.log
+    monkeypatch.setattr(FakeSMTP, "logins", 0)
+    monkeypatch.setattr(FakeSMTP, "sent", [])
+    monkeypatch.setattr(FakeSMTP, "errors", {})
+    monkeypatch.setattr(smtplib, "SMTP_SSL", FakeSMTP)
+    monkeypatch.setattr(user_tasks.settings.email, "debug_mode", False)
+    return FakeSMTP
+
+
+@pytest.fixture
+def pending(monkeypatch, smtp):
+    """Pending list on a fake redis, emails sent without a database lookup"""
+    redis = FakeRedis()
+    monkeypatch.setattr(user_tasks, "redis", redis)
+    monkeypatch.setattr(
+        user_tasks,
+        "try_to_send_pwd_reset_emails",
+        lambda emails: user_tasks.send_emails([(email, "message") for email in emails]),
+    )
+    monkeypatch.setattr(
+        user_tasks, "get_current_job", lambda: SimpleNamespace(retries_left=3)
+    )
+    return redis
+
+
+def queued(redis):
+    return [email.decode() for email in redis.lists.get(user_tasks.PWD_RESET_QUEUE, [])]
+
+
+def test_send_batch_with_a_single_login(pending, smtp):
+    emails = [f"user{i}@dm.com" for i in range(5)]
+    pending.rpush(user_tasks.PWD_RESET_QUEUE, *emails)
+
+    user_tasks.send_pending_pwd_reset_emails()
+
+    assert smtp.logins == 1
+    assert smtp.sent == emails
+    assert queued(pending) == []
+
+
+def test_failure_pushes_back_unsent_emails_in_order(pending, smtp):
+    emails = [f"user{i}@dm.com" for i in range(5)]
+    smtp.errors["user2@dm.com"] = smtplib.SMTPServerDisconnected("connection lost")
+    pending.rpush(user_tasks.PWD_RESET_QUEUE, *emails, "later@dm.com")
+
+    with pytest.raises(user_tasks.EmailError):
+        user_tasks.send_pending_pwd_reset_emails()
+
+    assert smtp.sent == emails[:2]
+    assert queued(pending) == [*emails[2:], "later@dm.com"]
+
+
+def test_refused_recipient_does_not_block_the_others(pending, smtp, tmp_path):
+    emails = [f"user{i}@dm.com" for i in range(5)]
+    smtp.errors["user1@dm.com"] = smtplib.SMTPRecipientsRefused(
+        {"user1@dm.com": (550, b"No such user")}
+    )
+    pending.rpush(user_tasks.PWD_RESET_QUEUE, *emails)
+
+    user_tasks.send_pending_pwd_reset_emails()
+
+    assert smtp.sent == [emails[0], *emails[2:]]
+    assert queued(pending) == []
+    assert "<user1@dm.com>" in (tmp_path / "email.log").read_text()
+
+
+def test_unsent_emails_dropped_when_retries_are_over(pending, smtp, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        user_tasks, "get_current_job", lambda: SimpleNamespace(retries_left=0)
+    )
+    smtp.errors["user0@dm.com"] = smtplib.SMTPServerDisconnected("connection lost")
+    pending.rpush(user_tasks.PWD_RESET_QUEUE, "user0@dm.com")
+
+    with pytest.raises(user_tasks.EmailError):
+        user_tasks.send_pending_pwd_reset_emails()
+
+    assert queued(pending) == []
+    assert "<user0@dm.com>" in (tmp_path / "email.log").read_text()
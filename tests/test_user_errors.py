@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+from sqlalchemy.exc import IntegrityError
+
+from dundie.routes.user import unique_violation_field
+
+
+class PgError(Exception):
+    """Mimics the error the asyncpg adapter wraps"""
+
+    pgcode = UNIQUE_VIOLATION
+
+
+class ConstraintCause(Exception):
+    def __init__(self, constraint_name):
+        self.constraint_name = constraint_name
+
+
+def pg_error(message, constraint_name=None):
+    orig = PgError(message)
+    orig.__cause__ = ConstraintCause(constraint_name) if constraint_name else None
+    return IntegrityError("INSERT", {}, orig)
+
+
+def sqlite_error(message):
+    return IntegrityError("INSERT", {}, sqlite3.IntegrityError(message))
+
+
+@pytest.mark.parametrize(
+    "error,field",
+    [
+        (pg_error("duplicate key", "user_username_key"), "username"),
+        (pg_error("duplicate key", "ix_user_email"), "email"),
+        (
+            pg_error(
+                'duplicate key value violates unique constraint "user_username_key"\n'
+                "DETAIL:  Key (username)=(my-email) already exists."
+            ),
+            "username",
+        ),
+        (sqlite_error("UNIQUE constraint failed: user.email"), "email"),
+        (sqlite_error("NOT NULL constraint failed: user.dept"), None),
+    ],
+)
+def test_unique_violation_field(error, field):
+    assert unique_violation_field(error) == field